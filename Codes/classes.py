@@ -62,6 +62,65 @@ class Runner:
         else:
             raise ValueError(f'{__genre_str} に対応する列挙帯が未定義です')
 
+    def to_start_tws(self, 
+            tw: TimeWindow, can_stop_time_be_outside_tw_to: bool, 
+            ) -> list[TimeWindow]:
+        """参加可能時間枠ごとに、開始時刻の取りうる範囲(両端を含む)のリストを生成する
+
+        Parameters
+        ----------
+        tw : TimeWindow
+            開催時間枠(終了時刻はこの右端を超えないものとする)
+        can_stop_time_be_outside_tw_to : bool
+            終了時刻が参加可能時間枠の外にでてもよいか否か
+
+        Returns
+        -------
+        list[TimeWindow]
+            開始時刻の取りうる範囲のリスト(範囲が空の参加可能時間枠は含まない)
+        """
+
+        td_min: dt.timedelta = (
+            min(self.est_all, ParamSet.MINIMUM_INTERVAL_FROM_TW_TO) 
+            if can_stop_time_be_outside_tw_to is True 
+            else self.est_all
+        )
+        start_tws: list[TimeWindow] = []
+        for i in self.tws:
+            fr: dt.datetime = max(i.fr, tw.fr)
+            to: dt.datetime = min(i.to - td_min, tw.to - self.est_all)
+            if fr <= to:
+                start_tws.append(TimeWindow(fr, to))
+            del fr, to
+        #
+        return start_tws
+
+    def to_clipped(self, tw: TimeWindow) -> Runner:
+        """参加可能時間枠を時間枠 tw と重なる部分に限った走者を生成する
+        (走者番号が同じなので、元の走者と等しいものとして扱われる)
+
+        Parameters
+        ----------
+        tw : TimeWindow
+            時間枠
+
+        Returns
+        -------
+        Runner
+            参加可能時間枠を限った走者
+        """
+
+        return Runner(
+            self.id, self.name, self.game, self.category, self.est_run, 
+            self.genre.value, 
+            [
+                TimeWindow(max(i.fr, tw.fr), min(i.to, tw.to)) 
+                for i in self.tws 
+                if max(i.fr, tw.fr) < min(i.to, tw.to)
+            ], 
+            self.url, self.ad, self.note, 
+        )
+
     def __repr__(self) -> str:
         return (
             f'{self.id:03d}: {self.name}'
@@ -69,6 +128,23 @@ class Runner:
 # ----------------------------------------------------------------------
 
 
+# ----------------------------------------------------------------------
+@dataclasses.dataclass(frozen=True, )
+class AssignmentRecord:
+    """走者1人分の割り当ての記録(出力用)"""
+
+    session: int
+    start: dt.datetime
+    end: dt.datetime
+    runner_id: int
+    name: str
+    game: str
+    category: str
+    genre: str
+    url: str
+# ----------------------------------------------------------------------
+
+
 # ----------------------------------------------------------------------
 @dataclasses.dataclass(frozen=True, order=True, )
 class TimeWindow:
@@ -0,0 +1,177 @@
+# Import
+# -----------------------------------------------------------------------------
+from __future__ import annotations
+import dataclasses
+import datetime as dt
+import numpy as np
+import numpy.typing as npt
+#
+from classes import RunnersAndTW, Runner, TimeWindow
+# -----------------------------------------------------------------------------
+
+
+# Classes
+# -----------------------------------------------------------------------------
+# ----------------------------------------------------------------------
+@dataclasses.dataclass(frozen=True, )
+class ForcedOverlaps:
+    """走者の開始時刻の取りうる範囲から導かれる、必ず配信中となる時間帯(必須部分)とその重なり"""
+
+    R: RunnersAndTW
+    can_stop_time_be_outside_tw_to: bool
+
+    def compulsory_parts(self) -> dict[Runner, TimeWindow]:
+        """走者ごとに、開始時刻によらず配信中となる時間帯
+        (最も遅い開始時刻 -- 最も早い開始時刻 + EST(全体))を求める
+
+        Returns
+        -------
+        dict[Runner, TimeWindow]
+            走者ごとの必須部分(必須部分がない走者は含まない)
+        """
+
+        parts: dict[Runner, TimeWindow] = {}
+        for r in self.R.runners:
+            start_tws: list[TimeWindow] = r.to_start_tws(
+                self.R.tw, self.can_stop_time_be_outside_tw_to
+            )
+            if len(start_tws) == 0:
+                continue
+            fr: dt.datetime = max(i.to for i in start_tws)
+            to: dt.datetime = min(i.fr for i in start_tws) + r.est_all
+            if fr < to:
+                parts[r] = TimeWindow(fr, to)
+            del start_tws, fr, to
+        #
+        return parts
+
+
+    def cliques(self) -> list[list[Runner]]:
+        """必須部分が共通の時刻をもつ走者の集まり(極大なもの)を求める。
+        同じ集まりの走者は、同じセッションにも前後関係にも置けない
+
+        Returns
+        -------
+        list[list[Runner]]
+            走者が2人以上の集まりのリスト
+        """
+
+        parts: dict[Runner, TimeWindow] = self.compulsory_parts()
+        # 時刻、終了(0)・開始(1)の順に走査する(右端は含まないため、同時刻では終了が先)
+        events: list[tuple[dt.datetime, int, Runner]] = sorted(
+            [(p.fr, 1, r) for r, p in parts.items()]
+            + [(p.to, 0, r) for r, p in parts.items()]
+        )
+        del parts
+        #
+        cliques: list[list[Runner]] = []
+        active: list[Runner] = []
+        is_last_event_start: bool = False
+        for _, is_start, r in events:
+            if is_start == 1:
+                active.append(r)
+                is_last_event_start = True
+            else:
+                if is_last_event_start is True and len(active) >= 2:
+                    cliques.append(sorted(active))
+                active.remove(r)
+                is_last_event_start = False
+        #
+        return cliques
+
+
+    def energetic_intervals(self, 
+            ) -> list[tuple[TimeWindow, dict[Runner, dt.timedelta]]]:
+        """必須部分の左端から右端までの時間帯ごとに、
+        各走者がその時間帯に必ず配信する時間の和が時間帯の長さを超えるものを求める。
+        (1セッションに置ける走者の、この時間の和は時間帯の長さ以下となる)
+        左端ごとに、超過が最大となる右端のみを採用する
+
+        Returns
+        -------
+        list[tuple[TimeWindow, dict[Runner, dt.timedelta]]]
+            時間帯と、走者ごとの必ず配信する時間(0 の走者は含まない)のリスト
+        """
+
+        parts: dict[Runner, TimeWindow] = self.compulsory_parts()
+        if len(parts) == 0:
+            return []
+        #
+        runners: list[Runner] = []
+        ess: list[int] = []
+        lss: list[int] = []
+        for r in self.R.runners:
+            start_tws: list[TimeWindow] = r.to_start_tws(
+                self.R.tw, self.can_stop_time_be_outside_tw_to
+            )
+            if len(start_tws) == 0:
+                continue
+            runners.append(r)
+            ess.append(self.__to_seconds(min(i.fr for i in start_tws)))
+            lss.append(self.__to_seconds(max(i.to for i in start_tws)))
+            del start_tws
+        # 走者ごとの最も早い・遅い開始時刻、EST(全体)(開催開始時刻からの秒数)
+        es: npt.NDArray[np.int64] = np.array(ess, dtype=np.int64)
+        ls: npt.NDArray[np.int64] = np.array(lss, dtype=np.int64)
+        est: npt.NDArray[np.int64] = np.array(
+            [int(r.est_all.total_seconds()) for r in runners], dtype=np.int64
+        )
+        del ess, lss
+        # 時間帯の左端・右端の候補
+        frs: list[int] = sorted({self.__to_seconds(p.fr) for p in parts.values()})
+        tos: npt.NDArray[np.int64] = np.array(
+            sorted({self.__to_seconds(p.to) for p in parts.values()}), 
+            dtype=np.int64
+        )
+        #
+        intervals: list[tuple[TimeWindow, dict[Runner, dt.timedelta]]] = []
+        for a in frs:
+            b: npt.NDArray[np.int64] = tos[tos > a][:, np.newaxis]
+            if len(b) == 0:
+                continue
+            # 時間帯との重なりの最小値(最も早い・遅い開始時刻のうち小さいほう)
+            energies: npt.NDArray[np.int64] = np.minimum(
+                np.maximum(np.minimum(es + est, b) - np.maximum(es, a), 0), 
+                np.maximum(np.minimum(ls + est, b) - np.maximum(ls, a), 0), 
+            )
+            excesses: npt.NDArray[np.int64] = (
+                energies.sum(axis=1) - (b[:, 0] - a)
+            )
+            k: int = int(np.argmax(excesses))
+            if excesses[k] > 0:
+                intervals.append((
+                    TimeWindow(
+                        self.R.tw.fr + dt.timedelta(seconds=a), 
+                        self.R.tw.fr + dt.timedelta(seconds=int(b[k, 0])), 
+                    ), 
+                    {
+                        runners[n]: dt.timedelta(seconds=int(energies[k, n]))
+                        for n in np.flatnonzero(energies[k] > 0)
+                    }, 
+                ))
+            del b, energies, excesses, k
+        #
+        return intervals
+
+
+    def __to_seconds(self, d: dt.datetime) -> int:
+        """日時を開催開始時刻からの秒数に変換する
+
+        Parameters
+        ----------
+        d : dt.datetime
+            日時
+
+        Returns
+        -------
+        int
+            開催開始時刻からの秒数
+        """
+
+        return int((d - self.R.tw.fr).total_seconds())
+
+
+    def __repr__(self) -> str:
+        return f'{self.R}'
+# ----------------------------------------------------------------------
+# -----------------------------------------------------------------------------
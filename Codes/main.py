@@ -8,6 +8,7 @@ import pathlib
 from models import MIPModel
 from classes import RunnersAndTW, Runner, TimeWindow
 from rw import RW
+from validator import Validator
 # -----------------------------------------------------------------------------
 
 
@@ -35,6 +36,12 @@ instance_date_tws: list[TimeWindow] = [
 ]
 # Solution
 solution_file: pathlib.Path = base_folder / 'Output' / 'soluiton.csv'
+solution_jsonl_file: pathlib.Path = base_folder / 'Output' / 'solution.jsonl'
+solution_parquet_file: pathlib.Path = (
+    base_folder / 'Output' / 'solution.parquet'
+)
+# (セッションごとに solution_1.ics, solution_2.ics, ... を出力)
+solution_ics_file: pathlib.Path = base_folder / 'Output' / 'solution.ics'
 solution_assignment: dict[Runner, tuple[int, TimeWindow]] = {}
 del base_folder
 # -----------------------------------------------------------------------------
@@ -46,8 +53,13 @@ del base_folder
 max_parallel_sessions: int = 2
 # Can the stop time be outside a time window (to)?
 can_stop_time_be_outside_tw_to: bool = True
-# Calculation time limit (seconds)
+# Calculation time limit (seconds, per block if rolling horizon is used)
 time_limit_s: int = 600
+# Solve the event block by block (rolling horizon)?
+use_rolling_horizon: bool = False
+# Length of a block whose assignment is fixed, and its lookahead
+rolling_horizon_block: dt.timedelta = dt.timedelta(days=1)
+rolling_horizon_lookahead: dt.timedelta = dt.timedelta(hours=6)
 # -----------------------------------------------------------------------------
 
 
@@ -57,14 +69,39 @@ instance: RunnersAndTW = RW.read_instance(instance_file, instance_date_tws)
 del instance_file, instance_date_tws
 
 model: MIPModel = MIPModel(instance)
-solution_assignment = model.solve_feasibility_and_min_s1_interval(
-    max_parallel_sessions, can_stop_time_be_outside_tw_to, time_limit_s
-)
+if use_rolling_horizon is True:
+    solution_assignment = model.solve_rolling_horizon(
+        max_parallel_sessions, can_stop_time_be_outside_tw_to, time_limit_s, 
+        rolling_horizon_block, rolling_horizon_lookahead, 
+    )
+else:
+    solution_assignment = model.solve_feasibility_and_min_s1_interval(
+        max_parallel_sessions, can_stop_time_be_outside_tw_to, time_limit_s
+    )
 del model
+del use_rolling_horizon, rolling_horizon_block, rolling_horizon_lookahead
+
+if len(solution_assignment) > 0:
+    validator: Validator = Validator(instance)
+    violations: list[str] = validator.validate(
+        max_parallel_sessions, can_stop_time_be_outside_tw_to, 
+        solution_assignment, 
+    )
+    for violation in violations:
+        print(violation)
+    if len(violations) > 0:
+        del violation
+    del validator, violations
 
 RW.write_solution(
     solution_file, instance.tw, max_parallel_sessions, solution_assignment
 )
+RW.write_solution_jsonl(solution_jsonl_file, solution_assignment)
+RW.write_solution_parquet(solution_parquet_file, solution_assignment)
+RW.write_solution_ics(
+    solution_ics_file, instance.tw, max_parallel_sessions, solution_assignment
+)
 del instance, max_parallel_sessions
-del solution_file, solution_assignment
+del solution_file, solution_jsonl_file, solution_parquet_file
+del solution_ics_file, solution_assignment
 # -----------------------------------------------------------------------------
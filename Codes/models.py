@@ -6,6 +6,7 @@ import datetime as dt
 import mip
 #
 from classes import RunnersAndTW, Runner, TimeWindow
+from forced_overlaps import ForcedOverlaps
 from params import ParamSet
 # -----------------------------------------------------------------------------
 
@@ -43,6 +44,242 @@ class MIPModel:
             走者のセッション番号・時間の割り当て(ない場合は {} )
         """
 
+        solution_assignment: dict[Runner, tuple[int, TimeWindow]] | None = (
+            self.__solve(
+                max_parallel_sessions, can_stop_time_be_outside_tw_to, 
+                time_limit_s, {}, set(), {}, {}, 
+            )
+        )
+        if solution_assignment is None:
+            return {}
+        return solution_assignment
+
+
+    def solve_rolling_horizon(self, 
+            max_parallel_sessions: int, 
+            can_stop_time_be_outside_tw_to: bool, 
+            time_limit_s: int, 
+            block: dt.timedelta, 
+            lookahead: dt.timedelta, 
+            ) -> dict[Runner, tuple[int, TimeWindow]]:
+        """solve_feasibility_and_min_s1_interval と同じ割り当てを、
+        開催時間枠を block ごとに区切った部分問題(先読み lookahead を含む)を順に解くことで行う。
+        各走者には、開始できる block のうち EST(全体)の和の割合が最も小さいものを、
+        選べる block の少ない走者から順に、担当 block としてあらかじめ決める。
+        各部分問題には、担当 block がその block 以前または次の block の走者を含め、できるだけ割り当てる
+        (block 内に開始する場合は確定し、先読み部分に開始する場合は次の部分問題の初期解とする)。
+        ただし、開始できる最後の block では、block 内に開始するよう必ず割り当てる。
+        このため、各走者は通常は担当 block とその前の block の部分問題にのみ含まれ、
+        担当 block で割り当てられなかった場合のみ、開始できる最後の block まで持ち越される。
+        部分問題で答えが見つからない場合は、直前の部分問題の確定を取り消し、
+        2つの部分問題をまとめた部分問題を解き直す
+        (最初の部分問題までまとめても答えが見つからない場合のみ、割り当てなしとする)
+
+        Parameters
+        ----------
+        max_parallel_sessions : int
+            最大同時開催セッションの数
+        can_stop_time_be_outside_tw_to : bool
+            各走者の終了時刻が時間枠の外にでてもよいか否か
+        time_limit_s : int
+            部分問題ごとの最大許容計算時間
+        block : dt.timedelta
+            割り当てを確定させる時間枠の長さ
+        lookahead : dt.timedelta
+            先読みする時間枠の長さ
+            (EST(全体)の最大値より短い場合は、その値に延長する。
+            これにより、開始できる時刻のある走者は、必ずいずれかの block 内に開始できる)
+
+        Returns
+        -------
+        dict[Runner, tuple[int, TimeWindow]]
+            走者のセッション番号・時間の割り当て(ない場合は {} )
+
+        Raises
+        ------
+        ValueError
+            block が 0 以下の場合、または lookahead が負の場合に発生
+        """
+
+        if block <= dt.timedelta():
+            raise ValueError(f'block ( {block} ) は正の値にしてください')
+        if lookahead < dt.timedelta():
+            raise ValueError(f'lookahead ( {lookahead} ) は 0 以上にしてください')
+        # block の右端の直前に開始する走者も、先読み部分で終了できるようにする
+        lookahead = max(
+            [lookahead] + [r.est_all for r in self.R.runners]
+        )
+        #
+        id_to_runner: dict[int, Runner] = {r.id: r for r in self.R.runners}
+        # block と、部分問題の時間枠(block + 先読み)
+        blocks: list[TimeWindow] = []
+        block_fr: dt.datetime = self.R.tw.fr
+        while block_fr < self.R.tw.to:
+            blocks.append(
+                TimeWindow(block_fr, min(block_fr + block, self.R.tw.to))
+            )
+            block_fr += block
+        del block_fr
+        windows: list[TimeWindow] = [
+            TimeWindow(b.fr, min(b.to + lookahead, self.R.tw.to)) 
+            for b in blocks
+        ]
+
+        # 担当 block
+        home_candidates: dict[Runner, list[int]] = {}
+        for r in self.R.runners:
+            home_candidates[r] = [
+                k for k, (b, window) in enumerate(zip(blocks, windows)) 
+                if any(
+                    i.fr < b.to 
+                    for i in r.to_start_tws(window, can_stop_time_be_outside_tw_to)
+                )
+            ]
+            if len(home_candidates[r]) == 0:
+                print(f'{r} を開催時間枠内に割り当てられないため、答えが存在しません')
+                return {}
+        del r
+        loads: list[dt.timedelta] = [dt.timedelta() for _ in blocks]
+        homes: dict[Runner, int] = {}
+        for r in sorted(
+                self.R.runners, key=lambda rb: (len(home_candidates[rb]), rb.id)
+                ):
+            homes[r] = min(
+                home_candidates[r], 
+                key=lambda k: (
+                    (loads[k] + r.est_all) / (blocks[k].to - blocks[k].fr), k
+                ), 
+            )
+            loads[homes[r]] += r.est_all
+        del r
+        # 開始できる最後の block
+        last_homes: dict[Runner, int] = {
+            r: max(home_candidates[r]) for r in self.R.runners
+        }
+        del home_candidates, loads
+
+        # 部分問題
+        # (答えが見つからない場合は、直前の部分問題の確定を取り消し、まとめて解き直す)
+        solution_assignment: dict[Runner, tuple[int, TimeWindow]] = {}
+        carried_assignment: dict[Runner, tuple[int, TimeWindow]] = {}
+        # 解いた部分問題の最初の block と、解く前の確定・持ち越した割り当て
+        solved: list[
+            tuple[
+                int, 
+                dict[Runner, tuple[int, TimeWindow]], 
+                dict[Runner, tuple[int, TimeWindow]], 
+            ]
+        ] = []
+        k_fr: int = 0
+        k: int = 0
+        while k < len(blocks):
+            b: TimeWindow = TimeWindow(blocks[k_fr].fr, blocks[k].to)
+            window: TimeWindow = TimeWindow(blocks[k_fr].fr, windows[k].to)
+            # 部分問題の走者(参加可能時間枠を部分問題の時間枠に限ったもの)
+            # 開始できる最後の block がこの部分問題にない走者は、割り当てなくてもよいものとする
+            block_runners: list[Runner] = []
+            deferrable_runners: set[Runner] = set()
+            for r in self.R.runners:
+                if r in solution_assignment.keys() or homes[r] > k + 1:
+                    continue
+                if last_homes[r] <= k:
+                    block_runners.append(r.to_clipped(window))
+                elif len(
+                        r.to_start_tws(window, can_stop_time_be_outside_tw_to)
+                        ) > 0:
+                    block_runners.append(r.to_clipped(window))
+                    deferrable_runners.add(r)
+            del r
+            block_model: MIPModel = MIPModel(RunnersAndTW(block_runners, window))
+            # 確定済みの走者による、セッションごとの開始可能時刻
+            release: dict[int, int] = {}
+            for s_tw in solution_assignment.values():
+                if s_tw[1].to > window.fr:
+                    release[s_tw[0]] = max(
+                        release.get(s_tw[0], 0), block_model.__to_int(s_tw[1].to)
+                    )
+            # 開始できる最後の block がこの部分問題にある走者は、block 内に開始する
+            latest_starts: dict[Runner, int] = {
+                r: block_model.__to_int(b.to) - 1 
+                for r in block_runners if r not in deferrable_runners
+            }
+            #
+            block_assignment: dict[Runner, tuple[int, TimeWindow]] | None
+            if len(block_runners) == 0:
+                block_assignment = {}
+            elif len(block_runners) == 1:
+                block_assignment = block_model.__solve_single(
+                    max_parallel_sessions, can_stop_time_be_outside_tw_to, 
+                    release, deferrable_runners, latest_starts, 
+                )
+            else:
+                block_assignment = block_model.__solve(
+                    max_parallel_sessions, can_stop_time_be_outside_tw_to, 
+                    time_limit_s, release, deferrable_runners, latest_starts, 
+                    carried_assignment, 
+                )
+            #
+            if block_assignment is None:
+                if len(solved) == 0:
+                    print(f'{window} の部分問題で答えが見つかりませんでした')
+                    return {}
+                print(f'{window} の部分問題で答えが見つからないため、直前の部分問題とまとめて解き直します')
+                k_fr, solution_assignment, carried_assignment = solved.pop()
+            else:
+                solved.append(
+                    (k_fr, dict(solution_assignment), dict(carried_assignment))
+                )
+                carried_assignment = {}
+                for r, s_tw in block_assignment.items():
+                    if s_tw[1].fr < b.to:
+                        solution_assignment[id_to_runner[r.id]] = s_tw
+                    else:
+                        carried_assignment[id_to_runner[r.id]] = s_tw
+                k += 1
+                k_fr = k
+            del b, window, block_runners, deferrable_runners, block_model
+            del release, latest_starts, block_assignment
+        del solved, k_fr, k
+        #
+        return solution_assignment
+
+
+    def __solve(self, 
+            max_parallel_sessions: int, 
+            can_stop_time_be_outside_tw_to: bool, 
+            time_limit_s: int, 
+            release: dict[int, int], 
+            deferrable_runners: set[Runner], 
+            latest_starts: dict[Runner, int], 
+            start_assignment: dict[Runner, tuple[int, TimeWindow]], 
+            ) -> dict[Runner, tuple[int, TimeWindow]] | None:
+        """solve_feasibility_and_min_s1_interval の本体。
+        セッションごとの開始可能時刻、割り当てなくてもよい走者、走者ごとの最も遅い開始時刻、
+        初期解を指定できる
+
+        Parameters
+        ----------
+        max_parallel_sessions : int
+            最大同時開催セッションの数
+        can_stop_time_be_outside_tw_to : bool
+            各走者の終了時刻が時間枠の外にでてもよいか否か
+        time_limit_s : int
+            最大許容計算時間
+        release : dict[int, int]
+            セッション番号ごとの開始可能時刻(開催開始時刻を 0 とする経過値、ない場合は 0 )
+        deferrable_runners : set[Runner]
+            割り当てなくてもよい走者(できるだけ割り当てる)
+        latest_starts : dict[Runner, int]
+            走者ごとの最も遅い開始時刻(開催開始時刻を 0 とする経過値、ない場合は制限なし)
+        start_assignment : dict[Runner, tuple[int, TimeWindow]]
+            初期解として与える走者のセッション番号・時間の割り当て
+
+        Returns
+        -------
+        dict[Runner, tuple[int, TimeWindow]] | None
+            走者のセッション番号・時間の割り当て(ない場合は None )
+        """
+
         # Additional input
         J: list[int] = [j for j in range(1, max_parallel_sessions + 1)]
 
@@ -55,7 +292,11 @@ class MIPModel:
         #   Variables
         t: dict[Runner, mip.Var] = {
             r: m.add_var(
-                lb=0, ub=self.__to_int(self.R.tw.to - r.est_all), 
+                lb=0, 
+                ub=min(
+                    self.__to_int(self.R.tw.to - r.est_all), 
+                    latest_starts.get(r, self.__to_int(self.R.tw.to)), 
+                ), 
                 var_type=mip.CONTINUOUS, name=f't({r.id})', 
             ) 
             for r in self.R.runners
@@ -92,6 +333,10 @@ class MIPModel:
             for j in J
         }
         weight[J[-1]] = 0
+        # 割り当てなかった走者(割り当てなくてもよい走者のみ)1人あたりの重み
+        weight_deferred: int = len(J) * 10 ** (
+            len(str(self.__to_int(self.R.tw.to))) * (len(J) - 1)
+        )
         #
         m.objective = mip.minimize(
             mip.xsum(
@@ -104,6 +349,10 @@ class MIPModel:
                 )
                 for j in J
             )
+            + mip.xsum(
+                weight_deferred * (1 - mip.xsum(s[r, j] for j in J)) 
+                for r in self.R.runners if r in deferrable_runners
+            )
         )
         m.add_constr(
             mip.xsum(
@@ -125,9 +374,24 @@ class MIPModel:
             m.add_constr(
                 mip.xsum(w[r, i] for i in r.tws) == 1, f'sum_w({r.id})'
             )
-            m.add_constr(
-                mip.xsum(s[r, j] for j in J) == 1, f'sum_s({r.id})'
-            )
+            if r in deferrable_runners:
+                m.add_constr(
+                    mip.xsum(s[r, j] for j in J) <= 1, f'sum_s({r.id})'
+                )
+            else:
+                m.add_constr(
+                    mip.xsum(s[r, j] for j in J) == 1, f'sum_s({r.id})'
+                )
+        del r
+        #
+        for r in self.R.runners:
+            for j in J:
+                if release.get(j, 0) > 0:
+                    m.add_constr(
+                        t[r] >= release[j] * s[r, j], 
+                        f't_release({r.id},{j})'
+                    )
+            del j
         del r
         #
         for r in self.R.runners:
@@ -174,16 +438,54 @@ class MIPModel:
                     t[r1] + self.__to_int(self.R.tw.fr + r1.est_all) <= t[r2] + self.__to_int(self.R.tw.to) * (1 - z[r1, r2]),
                     f'tz({r1.id},{r2.id})'
                 )
-            del r2
+            if len([rb for rb in self.R.runners if r1 != rb]) > 0:
+                del r2
         del r1
 
+        #   Cuts
+        if ParamSet.ADD_FORCED_OVERLAP_CUTS is True:
+            forced_overlaps: ForcedOverlaps = ForcedOverlaps(
+                self.R, can_stop_time_be_outside_tw_to
+            )
+            # 必須部分が重なる走者は、同じセッションにも前後関係にも置けない
+            for c in forced_overlaps.cliques():
+                for j in J:
+                    m.add_cut(mip.xsum(s[r, j] for r in c) <= 1)
+                del j
+                m.add_cut(
+                    mip.xsum(z[r1, r2] for r1 in c for r2 in c if r1 != r2) <= 0
+                )
+            # 1セッションに置ける走者が時間帯に必ず配信する時間の和は、時間帯の長さ以下
+            for i, energies in forced_overlaps.energetic_intervals():
+                for j in J:
+                    m.add_cut(
+                        mip.xsum(
+                            self.__to_int(self.R.tw.fr + e) * s[r, j] 
+                            for r, e in energies.items()
+                        ) 
+                        <= self.__to_int(i.to) - self.__to_int(i.fr)
+                    )
+                del j
+            del forced_overlaps
+
+        # Start
+        if len(start_assignment) > 0:
+            m.start = [
+                (v, float(value)) 
+                for r, s_tw in start_assignment.items() if r in t.keys() 
+                for v, value in [
+                    (s[r, s_tw[0]], 1), (t[r], self.__to_int(s_tw[1].fr)), 
+                ]
+            ]
+
         # Run
         m.max_seconds = time_limit_s
         status: mip.OptimizationStatus = m.optimize()
 
         # Solution
-        solution_assignment: dict[Runner, tuple[int, TimeWindow]] = {}
+        solution_assignment: dict[Runner, tuple[int, TimeWindow]] | None = None
         if status == mip.OptimizationStatus.OPTIMAL or status == mip.OptimizationStatus.FEASIBLE:
+            solution_assignment = {}
             for r in self.R.runners:
                 for j in J:
                     if s[r, j].x > 1.0 - m.integer_tol:
@@ -203,6 +505,57 @@ class MIPModel:
         return solution_assignment
 
 
+    def __solve_single(self, 
+            max_parallel_sessions: int, 
+            can_stop_time_be_outside_tw_to: bool, 
+            release: dict[int, int], 
+            deferrable_runners: set[Runner], 
+            latest_starts: dict[Runner, int], 
+            ) -> dict[Runner, tuple[int, TimeWindow]] | None:
+        """走者が1人の場合の __solve 。MIPモデルを作らず、
+        若いセッション番号から順に、最も早い開始時刻に割り当てる
+
+        Parameters
+        ----------
+        max_parallel_sessions : int
+            最大同時開催セッションの数
+        can_stop_time_be_outside_tw_to : bool
+            各走者の終了時刻が時間枠の外にでてもよいか否か
+        release : dict[int, int]
+            セッション番号ごとの開始可能時刻(開催開始時刻を 0 とする経過値、ない場合は 0 )
+        deferrable_runners : set[Runner]
+            割り当てなくてもよい走者
+        latest_starts : dict[Runner, int]
+            走者ごとの最も遅い開始時刻(開催開始時刻を 0 とする経過値、ない場合は制限なし)
+
+        Returns
+        -------
+        dict[Runner, tuple[int, TimeWindow]] | None
+            走者のセッション番号・時間の割り当て(ない場合は None )
+        """
+
+        r: Runner = self.R.runners[0]
+        start_tws: list[TimeWindow] = r.to_start_tws(
+            self.R.tw, can_stop_time_be_outside_tw_to
+        )
+        for j in range(1, max_parallel_sessions + 1):
+            for i in start_tws:
+                fr: dt.datetime = max(
+                    i.fr, self.__to_datetime(release.get(j, 0))
+                )
+                if (
+                        fr <= i.to 
+                        and self.__to_int(fr) 
+                        <= latest_starts.get(r, self.__to_int(self.R.tw.to))
+                        ):
+                    return {r: (j, TimeWindow(fr, fr + r.est_all))}
+                del fr
+        #
+        if r in deferrable_runners:
+            return {}
+        return None
+
+
     def __to_int(self, d: dt.datetime) -> int:
         """日時を開催開始時刻を 0 、1単位を Param.EST_ALL_MINIMUM_UNIT とする経過値に変換する
 
@@ -28,5 +28,12 @@ class ParamSet:
     MINIMUM_INTERVAL_FROM_TW_TO: ClassVar[dt.timedelta] = dt.timedelta(
         minutes=60
     )
+    # 入力の日時(タイムゾーンなし)のタイムゾーン
+    TIME_ZONE: ClassVar[dt.timezone] = dt.timezone(
+        dt.timedelta(hours=9), 'JST'
+    )
+    # MIPモデルに、必須部分(開始時刻によらず配信中となる時間帯)の重なりから導かれる
+    # 不等式(クリーク、エネルギー)をはじめから加えるか否か
+    ADD_FORCED_OVERLAP_CUTS: ClassVar[bool] = True
 # ----------------------------------------------------------------------
 # -----------------------------------------------------------------------------
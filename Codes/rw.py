@@ -1,11 +1,15 @@
 # Import
 # -----------------------------------------------------------------------------
 from __future__ import annotations
+import dataclasses
 import datetime as dt
+import json
 import pandas as pd
 import pathlib
+import re
+from typing import Any
 #
-from classes import RunnersAndTW, Runner, TimeWindow
+from classes import AssignmentRecord, RunnersAndTW, Runner, TimeWindow
 from params import ParamSet
 # -----------------------------------------------------------------------------
 
@@ -274,5 +278,376 @@ class RW:
             d += ParamSet.EST_ALL_MINIMUM_UNIT
         #
         df.to_csv(file, encoding='utf-8-sig', index=False)
+
+
+    @classmethod
+    def write_solution_jsonl(cls, 
+            file: pathlib.Path, 
+            assignment: dict[Runner, tuple[int, TimeWindow]], 
+            ) -> None:
+        """走者のセッション番号・時間の割り当てを、走者ごとに1行の JSON Lines 形式で出力ファイルに書き込む
+
+        Parameters
+        ----------
+        file : pathlib.Path
+            出力ファイルのパス
+        assignment : dict[Runner, tuple[int, TimeWindow]]
+            走者のセッション番号・時間の割り当て(ない場合は {} )
+        """
+
+        if len(assignment) == 0:
+            return
+        #
+        with open(file, 'w', encoding='utf-8', newline='\n') as f:
+            for record in cls.__to_records(assignment):
+                f.write(
+                    json.dumps(
+                        {
+                            k: v.isoformat() if isinstance(v, dt.datetime) else v
+                            for k, v in dataclasses.asdict(record).items()
+                        }, 
+                        ensure_ascii=False, 
+                    ) 
+                    + '\n'
+                )
+            del record
+
+
+    @classmethod
+    def write_solution_parquet(cls, 
+            file: pathlib.Path, 
+            assignment: dict[Runner, tuple[int, TimeWindow]], 
+            ) -> None:
+        """走者のセッション番号・時間の割り当てを、走者ごとに1行の Parquet 形式で出力ファイルに書き込む
+
+        Parameters
+        ----------
+        file : pathlib.Path
+            出力ファイルのパス
+        assignment : dict[Runner, tuple[int, TimeWindow]]
+            走者のセッション番号・時間の割り当て(ない場合は {} )
+        """
+
+        if len(assignment) == 0:
+            return
+        #
+        df: pd.DataFrame = pd.DataFrame(
+            [dataclasses.asdict(record) for record in cls.__to_records(assignment)]
+        )
+        df.to_parquet(file, index=False)
+
+
+    @classmethod
+    def write_solution_ics(cls, 
+            file: pathlib.Path, 
+            tw: TimeWindow, 
+            max_parallel_sessions: int, 
+            assignment: dict[Runner, tuple[int, TimeWindow]], 
+            ) -> None:
+        """走者のセッション番号・時間の割り当てを、セッションごとに iCalendar 形式で出力ファイルに書き込む
+        (ファイル名は file の名前の末尾にセッション番号を付けたもの。
+        日時は ParamSet.TIME_ZONE のものとみなし、UTC に変換して書き込む)
+
+        Parameters
+        ----------
+        file : pathlib.Path
+            出力ファイルのパス(セッション番号を付ける前)
+        tw : TimeWindow
+            開催時間枠
+        max_parallel_sessions : int
+            最大同時開催セッションの数
+        assignment : dict[Runner, tuple[int, TimeWindow]]
+            走者のセッション番号・時間の割り当て(ない場合は {} )
+        """
+
+        if len(assignment) == 0:
+            return
+        #
+        records: list[AssignmentRecord] = cls.__to_records(assignment)
+        dtstamp: str = dt.datetime.now(dt.timezone.utc).strftime(
+            '%Y%m%dT%H%M%SZ'
+        )
+        for j in range(1, max_parallel_sessions + 1):
+            lines: list[str] = [
+                'BEGIN:VCALENDAR', 
+                'VERSION:2.0', 
+                'PRODID:-//raid-relay-scheduler//JA', 
+                'CALSCALE:GREGORIAN', 
+                f'X-WR-CALNAME:{cls.__escape_ics_text(f"レイド {j}")}', 
+            ]
+            for record in [rec for rec in records if rec.session == j]:
+                lines.extend([
+                    'BEGIN:VEVENT', 
+                    # 日時・セッションが変わっても同じ予定として更新されるよう、
+                    # 走者番号とイベント(開催開始日時)のみから作る
+                    f'UID:runner-{record.runner_id:03d}-'
+                    + f"{tw.fr.strftime('%Y%m%dT%H%M')}@raid-relay-scheduler", 
+                    f'DTSTAMP:{dtstamp}', 
+                    f'DTSTART:{cls.__to_ics_utc(record.start)}', 
+                    f'DTEND:{cls.__to_ics_utc(record.end)}', 
+                    'SUMMARY:' + cls.__escape_ics_text(
+                        f'[{record.runner_id:02d}] {record.name}  {record.game}'
+                    ), 
+                    'DESCRIPTION:' + cls.__escape_ics_text(
+                        f'{record.game}, {record.genre}, {record.category}\n'
+                        + f'{record.url}'
+                    ), 
+                    'END:VEVENT', 
+                ])
+            lines.append('END:VCALENDAR')
+            #
+            with open(
+                    file.with_name(f'{file.stem}_{j}{file.suffix}'), 'w', 
+                    encoding='utf-8', newline='', 
+                    ) as f:
+                f.write(
+                    ''.join(cls.__fold_ics_line(line) + '\r\n' for line in lines)
+                )
+            del lines
+        del j
+
+
+    @classmethod
+    def __to_records(cls, 
+            assignment: dict[Runner, tuple[int, TimeWindow]], 
+            ) -> list[AssignmentRecord]:
+        """走者のセッション番号・時間の割り当てを、走者ごとの記録(セッション番号、開始時刻の順)に変換する
+
+        Parameters
+        ----------
+        assignment : dict[Runner, tuple[int, TimeWindow]]
+            走者のセッション番号・時間の割り当て
+
+        Returns
+        -------
+        list[AssignmentRecord]
+            走者ごとの記録
+        """
+
+        return [
+            AssignmentRecord(
+                s_tw[0], s_tw[1].fr, s_tw[1].to, 
+                r.id, r.name, r.game, r.category, r.genre.name, r.url, 
+            )
+            for r, s_tw in sorted(
+                assignment.items(), 
+                key=lambda r_s_tw: (r_s_tw[1][0], r_s_tw[1][1].fr, r_s_tw[0].id), 
+            )
+        ]
+
+
+    @classmethod
+    def __to_ics_utc(cls, d: dt.datetime) -> str:
+        """日時(ParamSet.TIME_ZONE)を iCalendar の UTC の日時の文字列に変換する
+
+        Parameters
+        ----------
+        d : dt.datetime
+            日時
+
+        Returns
+        -------
+        str
+            UTC の日時の文字列
+        """
+
+        return d.replace(tzinfo=ParamSet.TIME_ZONE).astimezone(
+            dt.timezone.utc
+        ).strftime('%Y%m%dT%H%M%SZ')
+
+
+    @classmethod
+    def __escape_ics_text(cls, s: str) -> str:
+        """文字列を iCalendar の TEXT 型の値としてエスケープする
+
+        Parameters
+        ----------
+        s : str
+            文字列
+
+        Returns
+        -------
+        str
+            エスケープした文字列
+        """
+
+        return (
+            s.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n')
+        )
+
+
+    @classmethod
+    def __fold_ics_line(cls, line: str) -> str:
+        """iCalendar の1行を 75 オクテットごとに折り返す(マルチバイト文字の途中では折り返さない)
+
+        Parameters
+        ----------
+        line : str
+            1行の文字列
+
+        Returns
+        -------
+        str
+            折り返した文字列
+        """
+
+        folded: list[str] = []
+        current: str = ''
+        current_octets: int = 0
+        for c in line:
+            c_octets: int = len(c.encode('utf-8'))
+            # 2行目以降は先頭の空白1オクテットを含める
+            if current_octets + c_octets > (75 if len(folded) == 0 else 74):
+                folded.append(current)
+                current = ''
+                current_octets = 0
+            current += c
+            current_octets += c_octets
+            del c_octets
+        folded.append(current)
+        #
+        return '\r\n '.join(folded)
+
+
+    @classmethod
+    def read_solution(cls, 
+            file: pathlib.Path, 
+            R: RunnersAndTW, 
+            ) -> tuple[dict[Runner, tuple[int, TimeWindow]], list[str]]:
+        """write_solution で書き込んだ出力ファイルから、走者のセッション番号・時間の割り当てを復元する。
+        同じセッションで走者の最後の時刻と別の走者の最初の時刻が重なる場合、
+        一方のセルが上書きされるため、その走者は復元できない(対応のとれない開始・終了として返す)
+
+        Parameters
+        ----------
+        file : pathlib.Path
+            出力ファイルのパス
+        R : RunnersAndTW
+            インスタンス
+
+        Returns
+        -------
+        tuple[dict[Runner, tuple[int, TimeWindow]], list[str]]
+            走者のセッション番号・時間の割り当てと、
+            復元できなかったセル(インスタンスにない走者番号、対応のとれない開始・終了)の一覧
+        """
+
+        id_to_runner: dict[int, Runner] = {r.id: r for r in R.runners}
+        #
+        df: pd.DataFrame = pd.read_csv(
+            file, encoding='utf-8-sig', dtype=str, keep_default_na=False
+        )
+        session_cols: list[str] = [
+            c for c in df.columns if str(c).startswith('レイド ')
+        ]
+        #
+        assignment: dict[Runner, tuple[int, TimeWindow]] = {}
+        unmatched: list[str] = []
+        for c in session_cols:
+            j: int = int(str(c).replace('レイド ', ''))
+            # 開始済みで終了していない走者(同一セッション内)
+            fr_open: dict[int, dt.datetime] = {}
+            for k, cell in enumerate(df[c].tolist()):
+                match: re.Match[str] | None = re.match(
+                    r'^\[(\d+)\](.*)$', str(cell).strip()
+                )
+                if match is None:
+                    continue
+                id: int = int(match.group(1))
+                d: dt.datetime = R.tw.fr + k * ParamSet.EST_ALL_MINIMUM_UNIT
+                if id not in id_to_runner.keys():
+                    unmatched.append(
+                        f'{c} の {d:%Y/%m/%d %H:%M} の走者番号 {id} が'
+                        + 'インスタンスにありません'
+                    )
+                    continue
+                # 開始のセルは走者番号の後に情報が続き、終了のセルは走者番号のみ
+                # (EST(全体)が最小単位の走者は、開始のセルが終了のセルで上書きされる)
+                if match.group(2).strip() != '':
+                    if id in fr_open.keys():
+                        unmatched.append(
+                            f'{c} の {fr_open[id]:%Y/%m/%d %H:%M} に開始した '
+                            + f'{id_to_runner[id]} の終了がありません'
+                        )
+                    fr_open[id] = d
+                elif (
+                        id in fr_open.keys() 
+                        or id_to_runner[id].est_all 
+                        == ParamSet.EST_ALL_MINIMUM_UNIT
+                        ):
+                    fr: dt.datetime = fr_open.pop(id, d)
+                    assignment[id_to_runner[id]] = (
+                        j, TimeWindow(fr, d + ParamSet.EST_ALL_MINIMUM_UNIT)
+                    )
+                    del fr
+                else:
+                    unmatched.append(
+                        f'{c} の {d:%Y/%m/%d %H:%M} に終了した '
+                        + f'{id_to_runner[id]} の開始がありません'
+                    )
+                del id, d
+                del match
+            for id, fr in fr_open.items():
+                unmatched.append(
+                    f'{c} の {fr:%Y/%m/%d %H:%M} に開始した '
+                    + f'{id_to_runner[id]} の終了がありません'
+                )
+            del j, fr_open
+        del session_cols
+        #
+        return assignment, unmatched
+
+
+    @classmethod
+    def read_solution_jsonl(cls, 
+            file: pathlib.Path, 
+            R: RunnersAndTW, 
+            ) -> tuple[dict[Runner, tuple[int, TimeWindow]], list[str]]:
+        """write_solution_jsonl で書き込んだ出力ファイルから、走者のセッション番号・時間の割り当てを復元する
+
+        Parameters
+        ----------
+        file : pathlib.Path
+            出力ファイルのパス
+        R : RunnersAndTW
+            インスタンス
+
+        Returns
+        -------
+        tuple[dict[Runner, tuple[int, TimeWindow]], list[str]]
+            走者のセッション番号・時間の割り当てと、
+            復元できなかった行(インスタンスにない走者番号、同じ走者の重複)の一覧
+        """
+
+        id_to_runner: dict[int, Runner] = {r.id: r for r in R.runners}
+        #
+        assignment: dict[Runner, tuple[int, TimeWindow]] = {}
+        unmatched: list[str] = []
+        with open(file, 'r', encoding='utf-8') as f:
+            for n, line in enumerate(f, start=1):
+                if line.strip() == '':
+                    continue
+                record: dict[str, Any] = json.loads(line)
+                id: int = int(record['runner_id'])
+                if id not in id_to_runner.keys():
+                    unmatched.append(
+                        f'{n} 行目の走者番号 {id} がインスタンスにありません'
+                    )
+                elif id_to_runner[id] in assignment.keys():
+                    unmatched.append(
+                        f'{n} 行目の {id_to_runner[id]} はすでに割り当てられています'
+                    )
+                else:
+                    assignment[id_to_runner[id]] = (
+                        int(record['session']), 
+                        TimeWindow(
+                            dt.datetime.fromisoformat(record['start']), 
+                            dt.datetime.fromisoformat(record['end']), 
+                        ), 
+                    )
+                del record, id
+        #
+        return assignment, unmatched
 # ----------------------------------------------------------------------
 # -----------------------------------------------------------------------------
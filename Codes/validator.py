@@ -0,0 +1,247 @@
+# Import
+# -----------------------------------------------------------------------------
+from __future__ import annotations
+import dataclasses
+import datetime as dt
+import numpy as np
+import numpy.typing as npt
+import pathlib
+#
+from classes import RunnersAndTW, Runner, TimeWindow
+from params import ParamSet
+from rw import RW
+# -----------------------------------------------------------------------------
+
+
+# Classes
+# -----------------------------------------------------------------------------
+# ----------------------------------------------------------------------
+@dataclasses.dataclass(frozen=True, )
+class Validator:
+    """走者のセッション番号・時間の割り当てを、MIPモデルとは独立に検証する"""
+
+    R: RunnersAndTW
+
+    def validate(self, 
+            max_parallel_sessions: int, 
+            can_stop_time_be_outside_tw_to: bool, 
+            assignment: dict[Runner, tuple[int, TimeWindow]], 
+            ) -> list[str]:
+        """割り当てが問題例の条件を満たすかを検証する。
+        時刻は開催開始時刻を 0 、1単位を Param.EST_ALL_MINIMUM_UNIT とする整数値の配列にし、
+        セッションごとに開始時刻で整列して走査する(O(n log n))
+
+        Parameters
+        ----------
+        max_parallel_sessions : int
+            最大同時開催セッションの数
+        can_stop_time_be_outside_tw_to : bool
+            各走者の終了時刻が時間枠の外にでてもよいか否か
+        assignment : dict[Runner, tuple[int, TimeWindow]]
+            走者のセッション番号・時間の割り当て
+
+        Returns
+        -------
+        list[str]
+            違反内容の一覧(違反がない場合は [] )
+        """
+
+        violations: list[str] = []
+
+        # 割り当てられていない走者、インスタンスにない走者
+        runner_ids: set[int] = {r.id for r in self.R.runners}
+        for r in sorted(self.R.runners):
+            if r not in assignment.keys():
+                violations.append(f'{r} が割り当てられていません')
+        for r in sorted(assignment.keys()):
+            if r.id not in runner_ids:
+                violations.append(f'{r} はインスタンスにない走者です')
+        del runner_ids
+        #
+        runners: list[Runner] = [
+            r for r in self.R.runners if r in assignment.keys()
+        ]
+        if len(runners) == 0:
+            return violations
+
+        # 整数値の配列
+        sessions: npt.NDArray[np.int64] = np.array(
+            [assignment[r][0] for r in runners], dtype=np.int64
+        )
+        frs: npt.NDArray[np.int64] = np.array(
+            [self.__to_int(assignment[r][1].fr) for r in runners], 
+            dtype=np.int64
+        )
+        tos: npt.NDArray[np.int64] = np.array(
+            [self.__to_int(assignment[r][1].to) for r in runners], 
+            dtype=np.int64
+        )
+        est_alls: npt.NDArray[np.int64] = np.array(
+            [r.est_all // ParamSet.EST_ALL_MINIMUM_UNIT for r in runners], 
+            dtype=np.int64
+        )
+        # 最小時間単位にのっていない日時
+        is_aligned: npt.NDArray[np.bool_] = np.array(
+            [
+                (assignment[r][1].fr - self.R.tw.fr)
+                % ParamSet.EST_ALL_MINIMUM_UNIT == dt.timedelta()
+                and (assignment[r][1].to - self.R.tw.fr)
+                % ParamSet.EST_ALL_MINIMUM_UNIT == dt.timedelta()
+                for r in runners
+            ], 
+            dtype=np.bool_
+        )
+        for k in np.flatnonzero(~is_aligned):
+            violations.append(
+                f'{runners[k]} の時間 {assignment[runners[k]][1]} が'
+                + f'最小時間単位 {ParamSet.EST_ALL_MINIMUM_UNIT} にのっていません'
+            )
+
+        # セッション番号、時間の長さ、開催時間枠
+        for k in np.flatnonzero(
+                (sessions < 1) | (sessions > max_parallel_sessions)
+                ):
+            violations.append(
+                f'{runners[k]} のセッション番号 {sessions[k]} が範囲外です'
+            )
+        for k in np.flatnonzero(tos - frs != est_alls):
+            violations.append(
+                f'{runners[k]} の時間 {assignment[runners[k]][1]} が'
+                + f'EST(全体) {runners[k].est_all} と一致しません'
+            )
+        for k in np.flatnonzero(
+                (frs < 0) | (tos > self.__to_int(self.R.tw.to))
+                ):
+            violations.append(
+                f'{runners[k]} の時間 {assignment[runners[k]][1]} が'
+                + f'開催時間枠 {self.R.tw} の外にあります'
+            )
+
+        # 参加可能時間枠
+        # (走者と時間枠の組ごとに判定し、走者ごとにいずれかの時間枠に収まるかを集計)
+        owners: list[int] = []
+        tw_frs: list[int] = []
+        tw_tos: list[int] = []
+        for k, r in enumerate(runners):
+            for i in r.tws:
+                owners.append(k)
+                tw_frs.append(self.__to_int(i.fr))
+                tw_tos.append(self.__to_int(i.to))
+        owner_arr: npt.NDArray[np.int64] = np.array(owners, dtype=np.int64)
+        del owners
+        if can_stop_time_be_outside_tw_to is True:
+            # 開始時刻を時間枠の右端から min(EST(全体), Param.MINIMUM_INTERVAL_FROM_TW_TO) 以上離す
+            td_mins: npt.NDArray[np.int64] = np.minimum(
+                est_alls, 
+                ParamSet.MINIMUM_INTERVAL_FROM_TW_TO
+                // ParamSet.EST_ALL_MINIMUM_UNIT
+            )
+        else:
+            td_mins = est_alls
+        is_in_tw: npt.NDArray[np.bool_] = np.zeros(len(runners), dtype=np.bool_)
+        if len(owner_arr) > 0:
+            np.logical_or.at(
+                is_in_tw, 
+                owner_arr, 
+                (frs[owner_arr] >= np.array(tw_frs, dtype=np.int64))
+                & (
+                    frs[owner_arr] + td_mins[owner_arr]
+                    <= np.array(tw_tos, dtype=np.int64)
+                ), 
+            )
+        del owner_arr, tw_frs, tw_tos, td_mins
+        for k in np.flatnonzero(~is_in_tw):
+            violations.append(
+                f'{runners[k]} の時間 {assignment[runners[k]][1]} が'
+                + f'参加可能時間枠 {runners[k].tws} に収まっていません'
+            )
+
+        # 同一セッション内の重なり
+        # (セッション番号、開始時刻の順に整列し、セッションごとに直前までの終了時刻の最大値と比較する。
+        # セッションをまたいで比較しないよう、セッションごとに時刻をずらす)
+        order: npt.NDArray[np.intp] = np.lexsort((frs, sessions))
+        offset: int = int(
+            max(tos.max(), self.__to_int(self.R.tw.to))
+            - min(frs.min(), 0) + 1
+        )
+        frs_sorted: npt.NDArray[np.int64] = frs[order] + sessions[order] * offset
+        tos_sorted: npt.NDArray[np.int64] = tos[order] + sessions[order] * offset
+        tos_max: npt.NDArray[np.int64] = np.maximum.accumulate(tos_sorted)
+        # 終了時刻の最大値をもつ走者(の整列後の位置)
+        holders: npt.NDArray[np.intp] = np.maximum.accumulate(
+            np.where(
+                tos_sorted == tos_max, np.arange(len(order)), 0
+            )
+        )
+        for k in np.flatnonzero(frs_sorted[1:] < tos_max[:-1]) + 1:
+            r1: Runner = runners[order[holders[k - 1]]]
+            r2: Runner = runners[order[k]]
+            violations.append(
+                f'レイド {assignment[r2][0]} で {r1} の時間 '
+                + f'{assignment[r1][1]} と {r2} の時間 '
+                + f'{assignment[r2][1]} が重なっています'
+            )
+            del r1, r2
+        #
+        return violations
+
+
+    def validate_file(self, 
+            file: pathlib.Path, 
+            max_parallel_sessions: int, 
+            can_stop_time_be_outside_tw_to: bool, 
+            ) -> list[str]:
+        """出力ファイルから割り当てを復元し、問題例の条件を満たすかを検証する。
+        拡張子が .jsonl の場合は write_solution_jsonl 、それ以外は write_solution の出力とみなす。
+        write_solution の出力では、同じセッションで重なる走者のセルが上書きされて失われうるため、
+        対応のとれない開始・終了も違反として含める(開始・終了を明示する JSON Lines 形式が確実)
+
+        Parameters
+        ----------
+        file : pathlib.Path
+            出力ファイルのパス
+        max_parallel_sessions : int
+            最大同時開催セッションの数
+        can_stop_time_be_outside_tw_to : bool
+            各走者の終了時刻が時間枠の外にでてもよいか否か
+
+        Returns
+        -------
+        list[str]
+            違反内容の一覧(違反がない場合は [] )
+        """
+
+        assignment: dict[Runner, tuple[int, TimeWindow]]
+        unmatched: list[str]
+        if file.suffix == '.jsonl':
+            assignment, unmatched = RW.read_solution_jsonl(file, self.R)
+        else:
+            assignment, unmatched = RW.read_solution(file, self.R)
+        #
+        return unmatched + self.validate(
+            max_parallel_sessions, can_stop_time_be_outside_tw_to, assignment, 
+        )
+
+
+    def __to_int(self, d: dt.datetime) -> int:
+        """日時を開催開始時刻を 0 、1単位を Param.EST_ALL_MINIMUM_UNIT とする経過値に変換する
+        (最小時間単位にのっていない場合は切り捨てる)
+
+        Parameters
+        ----------
+        d : dt.datetime
+            日時
+
+        Returns
+        -------
+        int
+            開催開始時刻を 0 、1単位を Param.EST_ALL_MINIMUM_UNIT とする経過値
+        """
+
+        return (d - self.R.tw.fr) // ParamSet.EST_ALL_MINIMUM_UNIT
+
+
+    def __repr__(self) -> str:
+        return f'{self.R}'
+# ----------------------------------------------------------------------
+# -----------------------------------------------------------------------------